@@ -1,12 +1,28 @@
 import requests
 import pandas as pd
 import datetime
-from time import sleep
+from time import sleep, monotonic
 import tkinter as tk
 from tkinter import messagebox, ttk
 import os
 import threading
 import math
+import heapq
+import gzip
+import json
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bisect import bisect_left, bisect_right
+
+LOWFARE_URL = "https://flights.airasia.com/fp/lfc/v1/lowfare"
+CURRENCY = "MYR"
+SERVICE_URL = "http://127.0.0.1:8765"
+# Seconds to wait for the lowfare API
+REQUEST_TIMEOUT = 30
+# Seconds a client waits for the next byte from the search service, which sends
+# a keepalive every SERVICE_HEARTBEAT seconds while a request is queued
+SERVICE_TIMEOUT = 60
+SERVICE_HEARTBEAT = 10
 
 class ToolTip:
     """Create a tooltip for a given widget."""
@@ -36,6 +52,419 @@ class ToolTip:
             self.tooltip.destroy()
             self.tooltip = None
 
+def lowfare_headers(access_token):
+    """Build the request headers expected by the lowfare API."""
+    return {
+        'accept': '*/*',
+        'authorization': f'Bearer {access_token}',
+        'channel_hash': 'c5e9028b4295dcf4d7c239af8231823b520c3cc15b99ab04cde71d0ab18d65bc',
+        'origin': 'https://www.airasia.com',
+        'referer': 'https://www.airasia.com/',
+        'user-agent': 'Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Mobile Safari/537.36',
+        'user-type': 'anonymous'
+    }
+
+class LiveTransport:
+    """Send lowfare requests straight to the AirAsia API."""
+    # Whether the transport paces requests itself, making the request delay redundant
+    paced = False
+
+    def __init__(self):
+        self.fetch_date = datetime.date.today().strftime("%Y-%m-%d")
+
+    def get(self, params, headers):
+        return requests.get(LOWFARE_URL, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
+
+    def close(self):
+        pass
+
+class RecordingTransport(LiveTransport):
+    """Send lowfare requests to the API and record every exchange to a gzip archive.
+
+    The archive is JSON lines: a header with the fetch date, then one entry per
+    request holding the query parameters, the response (or request error) and
+    the time offset since the sweep started. Request headers, and therefore the
+    access token, are never written. An existing archive is never overwritten;
+    a numbered filename is used instead (see `archive_path`).
+    """
+    def __init__(self, archive_path):
+        super().__init__()
+        directory, name = os.path.split(archive_path)
+        stem, dot, extension = name.partition('.')
+        self.archive_path = archive_path
+        counter = 1
+        # If file exists, append a counter until an unused filename is found.
+        while os.path.exists(self.archive_path):
+            self.archive_path = os.path.join(directory, f"{stem}_{counter}{dot}{extension}")
+            counter += 1
+        self.archive = gzip.open(self.archive_path, 'xt', encoding='utf-8')
+        self.archive.write(json.dumps({'fetch_date': self.fetch_date}) + "\n")
+        self.started = monotonic()
+
+    def get(self, params, headers):
+        entry = {'params': params}
+        try:
+            response = super().get(params, headers)
+        except requests.exceptions.RequestException as e:
+            entry['error'] = str(e)
+            raise
+        else:
+            entry['status'] = response.status_code
+            entry['body'] = response.text
+            return response
+        finally:
+            entry['offset'] = monotonic() - self.started
+            self.archive.write(json.dumps(entry) + "\n")
+            self.archive.flush()
+
+    def close(self):
+        self.archive.close()
+
+class StoredResponse:
+    """Minimal stand-in for `requests.Response` built from a recorded or served exchange."""
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        # Raise the same exception as requests.Response.json(), which is a RequestException
+        try:
+            return json.loads(self.text)
+        except ValueError as e:
+            raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error", response=self)
+
+class ReplayTransport:
+    """Serve lowfare responses from an archive written by `RecordingTransport`.
+
+    Responses are matched on the query parameters, in recorded order when the
+    same query was made more than once. By default they are served as fast as
+    possible; with `timed` each one waits until its original offset.
+    """
+    paced = True
+
+    def __init__(self, archive_path, timed=False):
+        self.timed = timed
+        self.responses = {}
+        with gzip.open(archive_path, 'rt', encoding='utf-8') as archive:
+            header = json.loads(archive.readline())
+            self.fetch_date = header['fetch_date']
+            for line in archive:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.responses.setdefault(self.request_key(entry['params']), []).append(entry)
+        self.started = monotonic()
+
+    @staticmethod
+    def request_key(params):
+        return json.dumps(params, sort_keys=True)
+
+    def get(self, params, headers):
+        entries = self.responses.get(self.request_key(params))
+        if not entries:
+            raise requests.exceptions.ConnectionError(
+                f"No recorded response for {params['departStation']} -> {params['arrivalStation']} on {params['date']}"
+            )
+        # Keep serving the last recording once repeats are exhausted
+        entry = entries.pop(0) if len(entries) > 1 else entries[0]
+        if self.timed:
+            remaining = entry['offset'] - (monotonic() - self.started)
+            if remaining > 0:
+                sleep(remaining)
+        if 'error' in entry:
+            raise requests.exceptions.ConnectionError(entry['error'])
+        return StoredResponse(entry['status'], entry['body'])
+
+    def close(self):
+        pass
+
+class ServiceTransport(LiveTransport):
+    """Send lowfare requests through a local search service (see `LowfareService`)."""
+    paced = True
+
+    def __init__(self, service_url):
+        super().__init__()
+        self.service_url = service_url.rstrip('/')
+
+    def get(self, params, headers):
+        response = requests.post(f"{self.service_url}/lowfare", json={'params': params},
+                                 headers={'authorization': headers['authorization']},
+                                 timeout=SERVICE_TIMEOUT)
+        response.raise_for_status()
+        entry = response.json()
+        if 'error' in entry:
+            raise requests.exceptions.ConnectionError(entry['error'])
+        return StoredResponse(entry['status'], entry['body'])
+
+class FareGraph:
+    """Time-expanded route graph built from fetched lowfare records.
+
+    Every fare is an edge from (departure station, date) to its arrival
+    station. Return legs are indexed per departure station and sorted by
+    date, so the legs inside a trip-day window are found with a bisect
+    instead of a scan over every fare.
+    """
+    def __init__(self, flight_data):
+        self.outbound = []
+        # departure station -> (sorted dates, [(date, price, arrival)], cheapest price)
+        self.return_index = {}
+
+        cheapest = {}
+        for flight in flight_data:
+            try:
+                date = datetime.datetime.strptime(flight['departure_date'], "%d/%m/%Y").date()
+                price = float(flight['price'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            # Overlapping fetch windows can repeat a fare; keep the cheapest
+            key = (flight['direction'], flight['departure_station'], flight['arrival_station'], date)
+            if key not in cheapest or price < cheapest[key]:
+                cheapest[key] = price
+
+        returns = {}
+        for (direction, dep, arr, date), price in cheapest.items():
+            if direction == 'outbound':
+                self.outbound.append((price, date, dep, arr))
+            elif direction == 'return':
+                returns.setdefault(dep, []).append((date, price, arr))
+        self.outbound.sort()
+        for dep, legs in returns.items():
+            legs.sort()
+            self.return_index[dep] = ([leg[0] for leg in legs], legs, min(leg[1] for leg in legs))
+
+    def cheapest_itineraries(self, origins, min_trip_days, max_trip_days, limit, open_jaw=False):
+        """Return up to `limit` of the cheapest itineraries, cheapest first.
+
+        Round trips return from the outbound arrival to the outbound origin.
+        With `open_jaw`, one end of the trip may differ: the return leg may
+        leave from another fetched destination, or land at another of the
+        given origins, but not both.
+        """
+        origins = set(origins)
+        if not self.outbound or not self.return_index or limit <= 0:
+            return []
+        cheapest_return = min(node[2] for node in self.return_index.values())
+        min_gap = datetime.timedelta(days=min_trip_days)
+        max_gap = datetime.timedelta(days=max_trip_days)
+
+        # Best `limit` itineraries so far, keyed on negated total so the dearest is at the root
+        best = []
+        counter = 0
+        for out_price, out_date, out_dep, out_arr in self.outbound:
+            bound = -best[0][0] if len(best) >= limit else math.inf
+            # Outbound legs are sorted by price, so nothing later can beat the bound
+            if out_price + cheapest_return >= bound:
+                break
+            nodes = self.return_index.keys() if open_jaw else (out_arr,)
+            for node in nodes:
+                if node == out_dep or node not in self.return_index:
+                    continue
+                dates, legs, node_min = self.return_index[node]
+                if out_price + node_min >= bound:
+                    continue
+                lo = bisect_left(dates, out_date + min_gap)
+                hi = bisect_right(dates, out_date + max_gap)
+                for in_date, in_price, in_arr in legs[lo:hi]:
+                    if open_jaw:
+                        # A single open jaw: the return shares an airport with the outbound
+                        if in_arr not in origins or (node != out_arr and in_arr != out_dep):
+                            continue
+                    elif in_arr != out_dep:
+                        continue
+                    total = out_price + in_price
+                    if total >= bound:
+                        continue
+                    counter += 1
+                    heapq.heappush(best, (-total, -counter, (out_date, out_dep, out_arr, out_price,
+                                                            in_date, node, in_arr, in_price)))
+                    if len(best) > limit:
+                        heapq.heappop(best)
+                    if len(best) >= limit:
+                        bound = -best[0][0]
+
+        results = []
+        for _, _, (out_date, out_dep, out_arr, out_price, in_date, in_dep, in_arr, in_price) in sorted(best, reverse=True):
+            results.append({
+                'Destination': out_arr,
+                'Outbound Date': out_date.strftime("%d/%m/%Y"),
+                'Outbound Weekend': '🏖️' if out_date.weekday() >= 5 else '',
+                'Inbound Date': in_date.strftime("%d/%m/%Y"),
+                'Inbound Weekend': '🏖️' if in_date.weekday() >= 5 else '',
+                'Outbound Price': out_price,
+                'Inbound Price': in_price,
+                'Total Price': out_price + in_price,
+                'Trip Days': (in_date - out_date).days,
+                'Itinerary': f"{out_dep}->{out_arr} / {in_dep}->{in_arr}"
+            })
+        return results
+
+class InFlightRequest:
+    """An upstream request that concurrent callers with the same key wait on."""
+    def __init__(self):
+        # Set once the request has left the pacing queue, and once it has an answer
+        self.sent = threading.Event()
+        self.done = threading.Event()
+        self.result = None
+
+class LowfareService:
+    """Shared lowfare fetcher behind the local search service.
+
+    Identical requests that arrive while one is already in flight wait for
+    that single upstream call instead of making their own (single-flight).
+    Every answer from the API is shared with the waiting callers, except
+    authorization failures and request errors: then they retry with their
+    own token, one of them leading the new call. Fares and 417 "skip this
+    window" answers are kept in memory for `cache_ttl` seconds and shared
+    by every client, and upstream calls are spaced at least
+    `delay_seconds` apart however many clients are connected.
+
+    Cached and shared responses are returned without checking the caller's
+    token against the API, so any client that can reach the service can
+    read them.
+    """
+    # Answers that depend on the caller's token rather than the query
+    retry_statuses = (401, 403)
+    cached_statuses = (200, 417)
+
+    def __init__(self, delay_seconds=2.5, cache_ttl=900, wait_timeout=2 * REQUEST_TIMEOUT):
+        self.delay_seconds = delay_seconds
+        self.cache_ttl = cache_ttl
+        self.wait_timeout = wait_timeout
+        self.transport = LiveTransport()
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.cache = {}
+        self.upstream_lock = threading.Lock()
+        self.last_upstream = -math.inf
+        self.stats = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'upstream_requests': 0}
+
+    def lowfare(self, params, authorization):
+        """Return the response entry (`status`/`body` or `error`) for a lowfare query."""
+        key = json.dumps(params, sort_keys=True)
+        with self.lock:
+            self.stats['requests'] += 1
+        coalesced = False
+        while True:
+            with self.lock:
+                cached = self.cache.get(key)
+                if cached and cached[0] > monotonic():
+                    self.stats['cache_hits'] += 1
+                    return cached[1]
+                call = self.in_flight.get(key)
+                leader = call is None
+                if leader:
+                    call = self.in_flight[key] = InFlightRequest()
+                elif not coalesced:
+                    coalesced = True
+                    self.stats['coalesced'] += 1
+
+            if leader:
+                break
+            # The leader may be queued behind the pacing for a while; only time
+            # the wait once its request is actually on the wire
+            call.sent.wait()
+            if not call.done.wait(self.wait_timeout):
+                return {'error': "Timed out waiting for a shared upstream request"}
+            if 'error' not in call.result and call.result['status'] not in self.retry_statuses:
+                return call.result
+            # The leader failed (maybe with its own bad token); retry with ours
+
+        try:
+            call.result = self.fetch_upstream(params, authorization, call)
+        finally:
+            call.sent.set()
+            if call.result is None:
+                call.result = {'error': "Upstream request failed"}
+            with self.lock:
+                del self.in_flight[key]
+                # Errors and authorization failures are retried, not cached
+                if call.result.get('status') in self.cached_statuses:
+                    now = monotonic()
+                    for expired in [k for k, (expires, _) in self.cache.items() if expires <= now]:
+                        del self.cache[expired]
+                    self.cache[key] = (now + self.cache_ttl, call.result)
+            call.done.set()
+        return call.result
+
+    def fetch_upstream(self, params, authorization, call):
+        """Make one paced request to the lowfare API on behalf of `call`."""
+        with self.upstream_lock:
+            wait = self.last_upstream + self.delay_seconds - monotonic()
+            if wait > 0:
+                sleep(wait)
+            self.last_upstream = monotonic()
+        call.sent.set()
+        with self.lock:
+            self.stats['upstream_requests'] += 1
+        access_token = authorization.split(' ', 1)[-1]
+        try:
+            response = self.transport.get(params, lowfare_headers(access_token))
+        except requests.exceptions.RequestException as e:
+            return {'error': str(e)}
+        return {'status': response.status_code, 'body': response.text}
+
+class LowfareServiceHandler(BaseHTTPRequestHandler):
+    """HTTP/JSON front end for `LowfareService`.
+
+    POST /lowfare with {"params": {...}} and the client's authorization header
+    returns {"status": ..., "body": ...} or {"error": ...}; GET /stats returns
+    the service counters. While a lowfare request is queued, the response is
+    kept alive with whitespace before the JSON body so that the client's read
+    timeout only fires if the service itself stops responding.
+    """
+    def do_GET(self):
+        if self.path == '/stats':
+            with self.server.service.lock:
+                stats = dict(self.server.service.stats)
+            self.send_json(200, stats)
+        else:
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/lowfare':
+            self.send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            params = json.loads(self.rfile.read(length))['params']
+            authorization = self.headers['authorization']
+            if not isinstance(params, dict) or not authorization:
+                raise ValueError("params and authorization are required")
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {'error': f"Bad request: {e}"})
+            return
+
+        result = {'entry': {'error': "Search service failed"}}
+        def run_lowfare():
+            result['entry'] = self.server.service.lowfare(params, authorization)
+        worker = threading.Thread(target=run_lowfare, daemon=True)
+        worker.start()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        try:
+            worker.join(SERVICE_HEARTBEAT)
+            while worker.is_alive():
+                self.wfile.write(b" ")
+                self.wfile.flush()
+                worker.join(SERVICE_HEARTBEAT)
+            self.wfile.write(json.dumps(result['entry']).encode('utf-8'))
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away; the request still completes and is cached
+            pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
 class FlightPriceScraper:
     def __init__(self):
         # In-memory storage for flight data and analysis results
@@ -93,8 +522,9 @@ class FlightPriceScraper:
 
     def fetch_flight_data(self):
         """Fetch flight data based on user inputs and then run analysis."""
+        transport_mode = self.transport_mode.get()
         access_token = self.token_entry.get().strip()
-        if not access_token:
+        if not access_token and not transport_mode.startswith("Replay"):
             messagebox.showerror("Input Error", "Please enter access token.")
             return
 
@@ -104,13 +534,12 @@ class FlightPriceScraper:
             messagebox.showerror("Input Error", "Invalid delay input. Please enter a number.")
             return
 
-        # Get selected departure code (only one selection allowed)
-        dep_selection = self.departure_listbox.curselection()
-        if not dep_selection:
-            messagebox.showerror("Input Error", "Please select a departure code.")
+        # Get selected departure codes (multiple selection allowed)
+        dep_indices = self.departure_listbox.curselection()
+        if not dep_indices:
+            messagebox.showerror("Input Error", "Please select at least one departure code.")
             return
-        dep_item = self.departure_listbox.get(dep_selection[0])
-        depart_code = dep_item.split(" - ")[0]
+        depart_codes = [self.departure_listbox.get(i).split(" - ")[0] for i in dep_indices]
 
         # Get selected destination codes (multiple selection allowed)
         dest_indices = self.destination_listbox.curselection()
@@ -119,7 +548,7 @@ class FlightPriceScraper:
             return
         destination_codes = [self.destination_listbox.get(i).split(" - ")[0] for i in dest_indices]
 
-        # Get flight type (One Way or Round Trip)
+        # Get flight type (One Way, Round Trip or Open Jaw)
         flight_type = self.flight_type.get()
 
         # Get date range from user inputs
@@ -135,136 +564,141 @@ class FlightPriceScraper:
             messagebox.showerror("Input Error", "From Date must be earlier than To Date.")
             return
 
+        # Every origin is paired with every destination, except itself
+        routes = [(dep, dest) for dep in depart_codes for dest in destination_codes if dep != dest]
+        if not routes:
+            messagebox.showerror("Input Error", "Departure and destination airports must differ.")
+            return
+
+        archive_path = self.archive_entry.get().strip()
+        if transport_mode in ("Record", "Replay (Fast)", "Replay (Timed)") and not archive_path:
+            messagebox.showerror("Input Error", "Please enter a recording file.")
+            return
+        service_url = self.service_entry.get().strip()
+        if transport_mode == "Search Service" and not service_url:
+            messagebox.showerror("Input Error", "Please enter the search service URL.")
+            return
+        if transport_mode == "Search Service":
+            transport = ServiceTransport(service_url)
+        elif transport_mode == "Live":
+            transport = LiveTransport()
+        else:
+            try:
+                if transport_mode == "Record":
+                    transport = RecordingTransport(archive_path)
+                elif transport_mode == "Replay (Fast)":
+                    transport = ReplayTransport(archive_path)
+                else:
+                    transport = ReplayTransport(archive_path, timed=True)
+            except (OSError, EOFError, ValueError, KeyError) as e:
+                messagebox.showerror("Recording Error", f"Could not open recording file: {e}")
+                return
+        # Replays and the search service pace themselves, so skip the request delay
+        if transport.paced:
+            delay_seconds = 0
+
         # Clear previous flight data, analysis, and logs
         self.flight_data = []
         self.analysis_data = None
         self.log_text.delete("1.0", tk.END)
-        self.log_message("Starting flight data fetch...")
+        self.log_message(f"Starting flight data fetch ({transport_mode})...")
 
         # Use a 30-day window for each API call
         range_days = 30
         num_iterations = math.ceil((end_date - start_date).days / range_days) + 1
-        # Calculate total requests (×2 for round-trip, 1 for one-way)
-        reqs_per_dest = 2 if flight_type == "Round Trip" else 1
-        total_requests = len(destination_codes) * num_iterations * reqs_per_dest
+        # Calculate total requests (×2 when return legs are needed, 1 for one-way)
+        reqs_per_route = 1 if flight_type == "One Way" else 2
+        total_requests = len(routes) * num_iterations * reqs_per_route
         self.progress_bar['maximum'] = total_requests
         self.progress_bar['value'] = 0
 
-        headers = {
-            'accept': '*/*',
-            'authorization': f'Bearer {access_token}',
-            'channel_hash': 'c5e9028b4295dcf4d7c239af8231823b520c3cc15b99ab04cde71d0ab18d65bc',
-            'origin': 'https://www.airasia.com',
-            'referer': 'https://www.airasia.com/',
-            'user-agent': 'Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Mobile Safari/537.36',
-            'user-type': 'anonymous'
-        }
-        base_url = "https://flights.airasia.com/fp/lfc/v1/lowfare"
-        currency = "MYR"
-
-        # Loop over each destination and over each date window
-        for destination in destination_codes:
-            current_date = start_date
-            while current_date <= end_date:
-                formatted_date = current_date.strftime("%d/%m/%Y")
-                params = {
-                    'departStation': depart_code,
-                    'arrivalStation': destination,
-                    'currency': currency,
-                    'airlineProfile': 'all',
-                    'date': formatted_date,
-                    'range': range_days,
-                    'isDestinationCity': 'false',
-                    'isOriginCity': 'false'
-                }
-                # Fetch outbound flights
-                self.log_message(f"Fetching outbound: {depart_code} -> {destination} on {formatted_date}")
-                try:
-                    response = requests.get(base_url, headers=headers, params=params)
-                    if response.status_code == 417:
-                        self.log_message(f"Skipping window starting {formatted_date} (417 error).")
+        headers = lowfare_headers(access_token)
+
+        # Loop over each origin/destination pair and over each date window
+        try:
+            for depart_code, destination in routes:
+                current_date = start_date
+                while current_date <= end_date:
+                    formatted_date = current_date.strftime("%d/%m/%Y")
+                    # Fetch outbound flights
+                    fetched = self.fetch_route_window(transport, headers, depart_code, destination,
+                                                      formatted_date, range_days, 'outbound')
+                    # Sleep after the outbound request
+                    sleep(delay_seconds)
+                    if not fetched:
+                        # A 417 on the outbound window skips the whole window
                         current_date += datetime.timedelta(days=range_days)
                         continue
-                    response.raise_for_status()
-                    data = response.json().get('data', [])
-                    for flight in data:
-                        self.flight_data.append({
-                            'departure_station': depart_code,
-                            'arrival_station': destination,
-                            'departure_date': flight['departureDate'],
-                            'price': flight['price'],
-                            'formatted_price': flight.get('shortFormattedPrice', ''),
-                            'short_price': flight.get('shortPrice', ''),
-                            'airline_profile': flight['airlineProfile'],
-                            'aa_flight': flight['aaFlight'],
-                            'direction': 'outbound',
-                            'fetch_date': datetime.date.today().strftime("%Y-%m-%d")
-                        })
-                    self.progress_bar['value'] += 1
-                    self.progress_label.config(
-                        text=f"Fetched outbound {depart_code}->{destination} for {formatted_date}"
-                    )
-                    self.root.update_idletasks()
-                except requests.exceptions.RequestException as e:
-                    self.log_message(f"Error (outbound) on {formatted_date}: {e}")
-                # Sleep after the outbound request
-                sleep(delay_seconds)
-
-                # For Round Trip, fetch return flights
-                if flight_type == "Round Trip":
-                    params_return = {
-                        'departStation': destination,
-                        'arrivalStation': depart_code,
-                        'currency': currency,
-                        'airlineProfile': 'all',
-                        'date': formatted_date,
-                        'range': range_days,
-                        'isDestinationCity': 'false',
-                        'isOriginCity': 'false'
-                    }
-                    self.log_message(f"Fetching return: {destination} -> {depart_code} on {formatted_date}")
-                    try:
-                        response = requests.get(base_url, headers=headers, params=params_return)
-                        if response.status_code == 417:
-                            self.log_message(f"Skipping return window starting {formatted_date} (417 error).")
-                            current_date += datetime.timedelta(days=range_days)
-                            continue
-                        response.raise_for_status()
-                        data = response.json().get('data', [])
-                        for flight in data:
-                            self.flight_data.append({
-                                'departure_station': destination,
-                                'arrival_station': depart_code,
-                                'departure_date': flight['departureDate'],
-                                'price': flight['price'],
-                                'formatted_price': flight.get('shortFormattedPrice', ''),
-                                'short_price': flight.get('shortPrice', ''),
-                                'airline_profile': flight['airlineProfile'],
-                                'aa_flight': flight['aaFlight'],
-                                'direction': 'return',
-                                'fetch_date': datetime.date.today().strftime("%Y-%m-%d")
-                            })
-                        self.progress_bar['value'] += 1
-                        self.progress_label.config(
-                            text=f"Fetched return {destination}->{depart_code} for {formatted_date}"
-                        )
-                        self.root.update_idletasks()
-                    except requests.exceptions.RequestException as e:
-                        self.log_message(f"Error (return) on {formatted_date}: {e}")
-                    # Sleep after the return request
-                    sleep(delay_seconds)
 
-                current_date += datetime.timedelta(days=range_days)
+                    # For Round Trip and Open Jaw, fetch return flights
+                    if flight_type != "One Way":
+                        self.fetch_route_window(transport, headers, destination, depart_code,
+                                                formatted_date, range_days, 'return')
+                        # Sleep after the return request
+                        sleep(delay_seconds)
 
-        # After scraping, if Round Trip, run analysis
-        if flight_type == "Round Trip":
+                    current_date += datetime.timedelta(days=range_days)
+        finally:
+            transport.close()
+        if transport_mode == "Record":
+            self.log_message(f"Recorded sweep to {transport.archive_path}")
+
+        # After scraping, pair up the outbound and return legs
+        if flight_type == "Round Trip" and len(depart_codes) == 1:
             self.perform_analysis()
+        elif flight_type != "One Way":
+            self.perform_itinerary_search(depart_codes, open_jaw=(flight_type == "Open Jaw"))
 
         # Export both flight data and (if available) analysis to Excel
         self.export_to_excel()
         messagebox.showinfo("Success", "Flight data fetched, analyzed, and exported to Excel.")
         self.log_message("Flight data fetching and analysis complete.")
 
+    def fetch_route_window(self, transport, headers, depart_code, arrival_code, formatted_date, range_days, direction):
+        """Fetch one lowfare window for a single route and store the results.
+
+        Returns False if the window was skipped because of a 417 error, True otherwise.
+        """
+        params = {
+            'departStation': depart_code,
+            'arrivalStation': arrival_code,
+            'currency': CURRENCY,
+            'airlineProfile': 'all',
+            'date': formatted_date,
+            'range': range_days,
+            'isDestinationCity': 'false',
+            'isOriginCity': 'false'
+        }
+        self.log_message(f"Fetching {direction}: {depart_code} -> {arrival_code} on {formatted_date}")
+        try:
+            response = transport.get(params, headers)
+            if response.status_code == 417:
+                self.log_message(f"Skipping {direction} window starting {formatted_date} (417 error).")
+                return False
+            response.raise_for_status()
+            data = response.json().get('data', [])
+            for flight in data:
+                self.flight_data.append({
+                    'departure_station': depart_code,
+                    'arrival_station': arrival_code,
+                    'departure_date': flight['departureDate'],
+                    'price': flight['price'],
+                    'formatted_price': flight.get('shortFormattedPrice', ''),
+                    'short_price': flight.get('shortPrice', ''),
+                    'airline_profile': flight['airlineProfile'],
+                    'aa_flight': flight['aaFlight'],
+                    'direction': direction,
+                    'fetch_date': transport.fetch_date
+                })
+            self.progress_bar['value'] += 1
+            self.progress_label.config(
+                text=f"Fetched {direction} {depart_code}->{arrival_code} for {formatted_date}"
+            )
+            self.root.update_idletasks()
+        except requests.exceptions.RequestException as e:
+            self.log_message(f"Error ({direction}) on {formatted_date}: {e}")
+        return True
+
     def perform_analysis(self):
         """Perform analysis for cheap round-trip tickets using user-specified trip day range."""
         if not self.flight_data:
@@ -323,17 +757,7 @@ class FlightPriceScraper:
                     'Trip Days': trip_days
                 })
         if results:
-            analysis_df = pd.DataFrame(results)
-            
-            # Apply sorting based on user selection
-            if self.sort_by.get() == 'Price (Low to High)':
-                analysis_df = analysis_df.sort_values(by='Total Price')
-            elif self.sort_by.get() == 'Price (High to Low)':
-                analysis_df = analysis_df.sort_values(by='Total Price', ascending=False)
-            elif self.sort_by.get() == 'Trip Days':
-                analysis_df = analysis_df.sort_values(by=['Trip Days', 'Total Price'])
-            elif self.sort_by.get() == 'Destination':
-                analysis_df = analysis_df.sort_values(by=['Destination', 'Total Price'])
+            analysis_df = self.sort_analysis(pd.DataFrame(results))
             self.analysis_data = analysis_df
             self.log_message("Analysis complete.")
             return analysis_df
@@ -341,6 +765,50 @@ class FlightPriceScraper:
             self.log_message("No valid round-trip combinations found for analysis.")
             return None
 
+    def perform_itinerary_search(self, depart_codes, open_jaw=False):
+        """Search the fare graph for the cheapest round-trip (and optionally open-jaw) itineraries."""
+        if not self.flight_data:
+            self.log_message("No flight data available for analysis.")
+            return None
+
+        try:
+            min_trip_days = int(self.min_trip_days_entry.get().strip())
+            max_trip_days = int(self.max_trip_days_entry.get().strip())
+        except ValueError:
+            self.log_message("Invalid trip days input; using defaults 3 and 5.")
+            min_trip_days = 3
+            max_trip_days = 5
+
+        try:
+            max_results = int(self.max_results_entry.get().strip())
+        except ValueError:
+            self.log_message("Invalid max results input; using default 100.")
+            max_results = 100
+
+        graph = FareGraph(self.flight_data)
+        results = graph.cheapest_itineraries(depart_codes, min_trip_days, max_trip_days,
+                                             max_results, open_jaw=open_jaw)
+        if results:
+            analysis_df = self.sort_analysis(pd.DataFrame(results))
+            self.analysis_data = analysis_df
+            self.log_message(f"Itinerary search complete: {len(analysis_df)} cheapest itineraries.")
+            return analysis_df
+        else:
+            self.log_message("No valid itineraries found for analysis.")
+            return None
+
+    def sort_analysis(self, analysis_df):
+        """Apply the user-selected sort order to an analysis DataFrame."""
+        if self.sort_by.get() == 'Price (Low to High)':
+            analysis_df = analysis_df.sort_values(by='Total Price')
+        elif self.sort_by.get() == 'Price (High to Low)':
+            analysis_df = analysis_df.sort_values(by='Total Price', ascending=False)
+        elif self.sort_by.get() == 'Trip Days':
+            analysis_df = analysis_df.sort_values(by=['Trip Days', 'Total Price'])
+        elif self.sort_by.get() == 'Destination':
+            analysis_df = analysis_df.sort_values(by=['Destination', 'Total Price'])
+        return analysis_df
+
     def export_to_excel(self):
         """Export flight data (grouped by route) and analysis (if available) to an Excel file without overwriting."""
         if not self.flight_data:
@@ -453,6 +921,29 @@ class FlightPriceScraper:
         ttk.Label(delay_frame, text="seconds").grid(row=0, column=2, sticky="W", padx=2)
         ToolTip(self.delay_entry, "Time to wait between API requests (in seconds)")
 
+        # Transport mode for recording, replaying or sharing a sweep
+        transport_frame = ttk.Frame(auth_frame)
+        transport_frame.grid(row=2, column=0, sticky="W", padx=5, pady=5)
+        ttk.Label(transport_frame, text="Transport:", style='Header.TLabel').grid(row=0, column=0, sticky="W", padx=5)
+        self.transport_mode = tk.StringVar(value="Live")
+        transport_options = ttk.Combobox(transport_frame, textvariable=self.transport_mode, state="readonly", width=15)
+        transport_options['values'] = ('Live', 'Record', 'Replay (Fast)', 'Replay (Timed)', 'Search Service')
+        transport_options.grid(row=0, column=1, sticky="W", padx=5)
+        ToolTip(transport_options, "Live: query the API\n"
+                                   "Record: query the API and save every response\n"
+                                   "Replay: serve saved responses instead of querying the API\n"
+                                   "Search Service: query the API through a shared local search service")
+        ttk.Label(transport_frame, text="File:").grid(row=0, column=2, sticky="W", padx=2)
+        self.archive_entry = ttk.Entry(transport_frame, width=25)
+        self.archive_entry.insert(0, "lowfare_recording.jsonl.gz")
+        self.archive_entry.grid(row=0, column=3, sticky="W", padx=5)
+        ToolTip(self.archive_entry, "Recording file written in Record mode and read in Replay modes")
+        ttk.Label(transport_frame, text="Service:").grid(row=1, column=2, sticky="W", padx=2, pady=2)
+        self.service_entry = ttk.Entry(transport_frame, width=25)
+        self.service_entry.insert(0, SERVICE_URL)
+        self.service_entry.grid(row=1, column=3, sticky="W", padx=5, pady=2)
+        ToolTip(self.service_entry, "URL of the search service started with: python airasiav2.py --serve")
+
         # Cities Selection Frame
         cities_frame = ttk.LabelFrame(main_frame, text="Airport Selection", padding="5")
         cities_frame.grid(row=2, column=0, columnspan=4, sticky="NSEW", padx=5, pady=10)
@@ -460,7 +951,7 @@ class FlightPriceScraper:
         # Departure Code Section
         dep_section = ttk.Frame(cities_frame)
         dep_section.grid(row=0, column=0, sticky="NSEW", padx=5, pady=5)
-        ttk.Label(dep_section, text="Departure Airport:", style='Header.TLabel').grid(row=0, column=0, sticky="W", padx=5)
+        ttk.Label(dep_section, text="Departure Airports:", style='Header.TLabel').grid(row=0, column=0, sticky="W", padx=5)
         
         dep_frame = ttk.Frame(dep_section)
         dep_frame.grid(row=1, column=0, sticky="W", padx=5, pady=2)
@@ -470,7 +961,7 @@ class FlightPriceScraper:
         self.departure_listbox = tk.Listbox(dep_frame, height=5, width=25,
                                           exportselection=0,
                                           yscrollcommand=dep_scroll.set,
-                                          selectmode=tk.SINGLE,
+                                          selectmode=tk.MULTIPLE,
                                           font=('Arial', 9),
                                           background='white',
                                           selectbackground='#0078D7')
@@ -491,6 +982,10 @@ class FlightPriceScraper:
         ttk.Button(btn_frame, text="Add", command=self.add_departure_code).grid(row=0, column=0, padx=2)
         ttk.Button(btn_frame, text="Delete", command=self.delete_departure_code).grid(row=0, column=1, padx=2)
         
+        # Help text for multiple selection
+        ttk.Label(dep_section, text="Select several origins for multi-origin and open-jaw searches",
+                 font=('Arial', 8, 'italic')).grid(row=2, column=0, sticky="W", padx=5, pady=2)
+        
         # Pre-populate departure codes
         for code in self.city_codes:
             self.departure_listbox.insert(tk.END, code)
@@ -589,6 +1084,13 @@ class FlightPriceScraper:
                                           value="Round Trip")
         round_trip_radio.grid(row=0, column=1, padx=15, pady=2)
         ToolTip(round_trip_radio, "Search for return flights with price analysis")
+        
+        open_jaw_radio = ttk.Radiobutton(radio_frame,
+                                        text="Open Jaw",
+                                        variable=self.flight_type,
+                                        value="Open Jaw")
+        open_jaw_radio.grid(row=0, column=2, padx=15, pady=2)
+        ToolTip(open_jaw_radio, "Also allow returning from another destination or to another origin (one or the other)")
 
         # Analysis Options Section
         analysis_frame = ttk.LabelFrame(main_frame, text="Analysis Options", padding="5")
@@ -618,6 +1120,15 @@ class FlightPriceScraper:
         self.max_trip_days_entry.grid(row=0, column=1, padx=2)
         ToolTip(self.max_trip_days_entry, "Maximum number of days for the trip")
         
+        # Max Results
+        results_frame = ttk.Frame(trip_frame)
+        results_frame.grid(row=0, column=3, padx=10)
+        ttk.Label(results_frame, text="Max Results:").grid(row=0, column=0)
+        self.max_results_entry = ttk.Entry(results_frame, width=6)
+        self.max_results_entry.insert(0, "100")
+        self.max_results_entry.grid(row=0, column=1, padx=2)
+        ToolTip(self.max_results_entry, "Number of cheapest itineraries kept for multi-origin and open-jaw searches")
+        
         # Sorting Options
         sort_frame = ttk.Frame(analysis_frame)
         sort_frame.grid(row=1, column=0, columnspan=2, sticky="W", padx=5, pady=5)
@@ -703,6 +1214,33 @@ class FlightPriceScraper:
     def run(self):
         self.root.mainloop()
 
+def run_service(host, port, delay_seconds, cache_ttl):
+    """Run the local search service until interrupted."""
+    server = ThreadingHTTPServer((host, port), LowfareServiceHandler)
+    server.service = LowfareService(delay_seconds=delay_seconds, cache_ttl=cache_ttl)
+    print(f"Search service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
 if __name__ == "__main__":
-    scraper = FlightPriceScraper()
-    scraper.run()
+    parser = argparse.ArgumentParser(description="AirAsia Flight Price Analyzer")
+    parser.add_argument('--serve', action='store_true',
+                        help="run the shared local search service instead of the GUI")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="service address (default: 127.0.0.1). Cached fares are served to any "
+                             "client that can reach this address, whatever token it sends")
+    parser.add_argument('--port', type=int, default=8765, help="service port (default: 8765)")
+    parser.add_argument('--delay', type=float, default=2.5,
+                        help="minimum seconds between upstream requests (default: 2.5)")
+    parser.add_argument('--cache-ttl', type=float, default=900,
+                        help="seconds to share a fetched window between clients (default: 900)")
+    args = parser.parse_args()
+    if args.serve:
+        run_service(args.host, args.port, args.delay, args.cache_ttl)
+    else:
+        scraper = FlightPriceScraper()
+        scraper.run()